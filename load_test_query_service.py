@@ -0,0 +1,106 @@
+"""
+Load test for query_service.py. Sends a mix of ticker lookups, range queries and top-k queries
+from several threads over keep-alive connections and reports requests/sec and latency percentiles.
+
+Start the service first, then run:
+    python load_test_query_service.py [--host 127.0.0.1] [--port 8000] [--threads 8] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from typing import List
+
+
+def get_request_paths(host: str, port: int) -> List[str]:
+    """
+    Build the mix of request paths to send, using the tickers currently served
+    :param host: Host of the query service
+    :param port: Port of the query service
+    :return: List of request paths
+    """
+    con = http.client.HTTPConnection(host, port)
+    con.request("GET", "/top?by=PE&k=1000")
+    ratios = json.loads(con.getresponse().read())
+    con.close()
+
+    paths = ["/screen", "/forecasts?k=10", "/top?by=PE&k=10", "/top?by=PB&k=10&order=desc"]
+    for record in ratios:
+        paths.append("/ratios/" + record["Ticker"])
+        paths.append("/ratios?pe_min={}&pe_max={}".format(record["PE"] * 0.9, record["PE"] * 1.1))
+        paths.append("/ratios?pe_max={}&pb_max={}".format(record["PE"], record["PB"]))
+
+    return paths
+
+
+def worker(host: str, port: int, paths: List[str], end_time: float, latencies: List[float], errors: List[int]):
+    """
+    Send requests until end_time, recording the latency of each one
+    """
+    rng = random.Random()
+    con = http.client.HTTPConnection(host, port)
+    while time.perf_counter() < end_time:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            con.request("GET", path)
+            response = con.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append(0)
+            con.close()
+            con = http.client.HTTPConnection(host, port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    con.close()
+
+
+def percentile(sorted_values: List[float], perc: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(perc / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local query service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Length of the test in seconds")
+    args = parser.parse_args()
+
+    paths = get_request_paths(host=args.host, port=args.port)
+    print("Sending " + str(len(paths)) + " distinct requests from " + str(args.threads) + " threads for "
+          + str(args.duration) + "s")
+
+    # one list per thread, list.append is thread safe but this avoids contention
+    latencies = [[] for _ in range(args.threads)]
+    errors = [[] for _ in range(args.threads)]
+    start = time.perf_counter()
+    end_time = start + args.duration
+    threads = [threading.Thread(target=worker, args=(args.host, args.port, paths, end_time, latencies[i], errors[i]))
+               for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+    num_errors = sum(len(thread_errors) for thread_errors in errors)
+    if not all_latencies:
+        print("No successful requests, " + str(num_errors) + " errors")
+        return
+
+    print("Requests:     " + str(len(all_latencies)) + " (" + str(num_errors) + " errors)")
+    print("Requests/sec: " + str(round(len(all_latencies) / elapsed, 1)))
+    print("p50 latency:  " + str(round(percentile(all_latencies, 50) * 1000, 3)) + " ms")
+    print("p99 latency:  " + str(round(percentile(all_latencies, 99) * 1000, 3)) + " ms")
+    print("max latency:  " + str(round(all_latencies[-1] * 1000, 3)) + " ms")
+
+
+if __name__ == "__main__":
+    main()
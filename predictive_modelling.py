@@ -9,7 +9,13 @@ from sklearn.metrics import mean_absolute_error
 import datetime as dt
 
 
-def prophet_price_prediction(sentiment_df: pd.DataFrame, ratios_df: pd.DataFrame):
+def prophet_price_prediction(sentiment_df: pd.DataFrame, ratios_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Predict prices for stocks with more positive than negative sentiment using Prophet
+    :param sentiment_df: Dataframe of the number of positive, neutral and negative tweets for each stock
+    :param ratios_df: Dataframe of tickers and their P/E and P/B ratios
+    :return: Dataframe of final stock picks, those predicted to increase in price
+    """
     # DataFrame that will be used at the end to hold our final stock picks
     final_stocks = pd.DataFrame(
         columns=['Ticker', 'P/E Ratio', 'P/B Ratio', 'Current Price', '1y Predicted Price', 'Price Increase (%)'])
@@ -127,4 +133,4 @@ def prophet_price_prediction(sentiment_df: pd.DataFrame, ratios_df: pd.DataFrame
         else:
             pass
 
-    pass
\ No newline at end of file
+    return final_stocks
@@ -0,0 +1,343 @@
+"""
+Local read-only HTTP/JSON service over the ratios, screen results and final stock picks saved
+in the sqlite database. The data is held in memory, indexed by ticker and by P/E and P/B ratio,
+and is reloaded in the background whenever the sqlite database changes.
+
+Run after initial_run_value_investing_tool.py (and optionally run_value_investing_tool.py):
+    python query_service.py [database file path] [port]
+
+Endpoints:
+    GET /health                                          Summary of the loaded data
+    GET /ratios/<ticker>                                 P/E and P/B ratios of a ticker
+    GET /ratios?pe_min=&pe_max=&pb_min=&pb_max=          Tickers with ratios in the given ranges
+    GET /top?by=PE|PB&k=10&order=asc|desc                k lowest (or highest) P/E or P/B stocks
+    GET /screen                                          Value and overvalued stocks
+    GET /forecasts?k=                                    Final stock picks, largest increase first
+    GET /forecasts/<ticker>                              Final stock pick for a ticker
+"""
+import bisect
+import json
+import math
+import os
+import pathlib
+import sqlite3 as lite
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# set global variables
+DB_FILE_PATH = "ratios_data.db"
+HOST = "127.0.0.1"
+PORT = 8000
+RELOAD_INTERVAL = 2.0
+DEFAULT_K = 10
+
+FINAL_STOCKS_COLUMNS = ["Ticker", "PE", "PB", "CurrentPrice", "PredictedPrice", "PriceIncrease"]
+
+
+class Snapshot:
+    """
+    Immutable in-memory copy of the sqlite data with the indexes used to answer queries.
+    A new snapshot is built on every reload and swapped in whole, so requests never see a
+    partially loaded state.
+    """
+
+    def __init__(self, ratios_rows: List[Tuple], final_stocks_rows: List[Tuple]):
+        """
+        :param ratios_rows: List of (ticker, P/E, P/B) rows from the ratio table
+        :param final_stocks_rows: List of rows from the final_stocks table
+        """
+        self.loaded_at = time.time()
+
+        # index by ticker, skipping rows that could not be formatted to numbers (e.g. 'N/A' or '1.2k')
+        self.ratios = {}
+        for ticker, pe, pb in ratios_rows:
+            if isinstance(ticker, str) and is_number(pe) and is_number(pb):
+                self.ratios[ticker.upper()] = {"Ticker": ticker, "PE": pe, "PB": pb}
+
+        # indexes by P/E and by P/B - sorted lists searched with bisect
+        self.by_pe = sorted((record["PE"], key) for key, record in self.ratios.items())
+        self.by_pb = sorted((record["PB"], key) for key, record in self.ratios.items())
+        self.pe_values = [pe for pe, _ in self.by_pe]
+        self.pb_values = [pb for pb, _ in self.by_pb]
+
+        self.screen = self._screen()
+
+        # final stock picks indexed by ticker, and sorted by predicted price increase
+        self.final_stocks = {}
+        for row in final_stocks_rows:
+            record = dict(zip(FINAL_STOCKS_COLUMNS, row))
+            if isinstance(record["Ticker"], str) and is_number(record["PriceIncrease"]):
+                self.final_stocks[record["Ticker"].upper()] = record
+        self.forecasts = sorted(self.final_stocks.values(), key=lambda r: r["PriceIncrease"], reverse=True)
+
+    def _screen(self) -> Dict:
+        """
+        Select the value and overvalued stocks, the same way as get_low_pe_pb_stocks and
+        get_high_pe_pb_stocks in clean_data.py
+        :return: Dictionary of value stocks and overvalued stocks
+        """
+        num_remaining_stocks = len(self.ratios)
+        ten_perc = math.ceil(num_remaining_stocks * 0.1)
+        ninety_perc = math.ceil(num_remaining_stocks * 0.9)
+
+        low_pe_stocks = {key for _, key in self.by_pe[:ten_perc]}
+        low_pb_stocks = {key for _, key in self.by_pb[:ten_perc]}
+        high_pe_stocks = {key for _, key in self.by_pe[ninety_perc:]}
+        high_pb_stocks = {key for _, key in self.by_pb[ninety_perc:]}
+
+        return {
+            "value_stocks": sorted(self.ratios[key]["Ticker"] for key in low_pe_stocks & low_pb_stocks),
+            "overvalued_stocks": sorted(self.ratios[key]["Ticker"] for key in high_pe_stocks & high_pb_stocks),
+        }
+
+    def ratios_in_range(self, pe_min: float, pe_max: float, pb_min: float, pb_max: float) -> List[Dict]:
+        """
+        Get the stocks with P/E and P/B ratios inside the given (inclusive) ranges
+        :return: List of ratio records, sorted by P/E
+        """
+        pe_start = bisect.bisect_left(self.pe_values, pe_min)
+        pe_end = bisect.bisect_right(self.pe_values, pe_max)
+        pb_start = bisect.bisect_left(self.pb_values, pb_min)
+        pb_end = bisect.bisect_right(self.pb_values, pb_max)
+
+        # scan whichever of the two ranges is narrower and filter on the other ratio
+        if pe_end - pe_start <= pb_end - pb_start:
+            keys = [key for _, key in self.by_pe[pe_start:pe_end]]
+        else:
+            keys = [key for _, key in self.by_pb[pb_start:pb_end]]
+
+        records = [self.ratios[key] for key in keys]
+        records = [r for r in records if pe_min <= r["PE"] <= pe_max and pb_min <= r["PB"] <= pb_max]
+
+        return sorted(records, key=lambda r: r["PE"])
+
+    def top(self, by: str, k: int, descending: bool) -> List[Dict]:
+        """
+        Get the k stocks with the lowest (or highest) P/E or P/B ratio
+        :param by: Ratio to rank by, PE or PB
+        :param k: Number of stocks to return
+        :param descending: Return the highest ratios instead of the lowest
+        :return: List of ratio records
+        """
+        index = self.by_pe if by == "PE" else self.by_pb
+        if descending:
+            keys = [key for _, key in reversed(index[max(len(index) - k, 0):])] if k else []
+        else:
+            keys = [key for _, key in index[:k]]
+
+        return [self.ratios[key] for key in keys]
+
+
+def is_number(value) -> bool:
+    """
+    Check if a value read from sqlite is a real number that can be sorted and compared
+    :param value: Value from the ratio or final_stocks table
+    :return: True if the value is an int or float and not NaN
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value)
+
+
+def database_version(database_file_path: str) -> Tuple:
+    """
+    Get a value that changes whenever the sqlite database (or its write-ahead log) is written to
+    :param database_file_path: File path of sqlite database (incl. file name)
+    :return: Tuple of modification times and sizes
+    """
+    version = []
+    for path in (database_file_path, database_file_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+
+    return tuple(version)
+
+
+def load_snapshot(database_file_path: str) -> Snapshot:
+    """
+    Read the ratio and final_stocks tables from the sqlite database into a new snapshot
+    :param database_file_path: File path of sqlite database (incl. file name)
+    :return: Snapshot of the data
+    """
+    # open read-only so the service can never modify the database
+    con = lite.connect(pathlib.Path(database_file_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        curs = con.cursor()
+        ratios_rows = curs.execute("SELECT Tickers, PE, PB FROM ratio").fetchall()
+        try:
+            final_stocks_rows = curs.execute("SELECT {} FROM final_stocks".format(", ".join(FINAL_STOCKS_COLUMNS))).fetchall()
+        except lite.OperationalError:
+            # run_value_investing_tool.py has not saved any final stock picks yet
+            final_stocks_rows = []
+    finally:
+        con.close()
+
+    return Snapshot(ratios_rows=ratios_rows, final_stocks_rows=final_stocks_rows)
+
+
+class DataStore:
+    """
+    Holds the latest snapshot and reloads it in a background thread when the database changes
+    """
+
+    def __init__(self, database_file_path: str, reload_interval: float = RELOAD_INTERVAL):
+        self.database_file_path = database_file_path
+        self.reload_interval = reload_interval
+        self.version = database_version(database_file_path)
+        self.snapshot = load_snapshot(database_file_path)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the snapshot if the database has changed since it was last loaded
+        :return: True if the snapshot was reloaded
+        """
+        version = database_version(self.database_file_path)
+        if version == self.version:
+            return False
+        try:
+            snapshot = load_snapshot(self.database_file_path)
+        except Exception as error:
+            # database is probably being rewritten, keep serving the old data and retry on the next check
+            print("Reload failed, keeping previous data: " + repr(error))
+            return False
+        self.snapshot = snapshot
+        self.version = version
+        print("Reloaded " + str(len(snapshot.ratios)) + " tickers from " + self.database_file_path)
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload_if_changed()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving JSON responses from the data store attached to the server
+    """
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without this keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # take one reference so the whole request is answered from the same snapshot
+        snapshot = self.server.store.snapshot
+
+        try:
+            status, body = route(snapshot, parts, params)
+        except ValueError as error:
+            status, body = 400, {"error": str(error)}
+
+        self.send_json(status, body)
+
+    def send_json(self, status: int, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # logging every request to stderr dominates the latency of a lookup
+        pass
+
+
+def route(snapshot: Snapshot, parts: List[str], params: Dict) -> Tuple[int, object]:
+    """
+    Answer a request from a snapshot
+    :param snapshot: Snapshot to answer the request from
+    :param parts: Path of the request split on '/'
+    :param params: Query string parameters of the request
+    :return: Tuple of HTTP status and JSON body
+    """
+    if parts == ["health"]:
+        return 200, {"loaded_at": snapshot.loaded_at,
+                     "tickers": len(snapshot.ratios),
+                     "final_stocks": len(snapshot.final_stocks)}
+
+    if parts == ["ratios"]:
+        return 200, snapshot.ratios_in_range(pe_min=float(params.get("pe_min", "-inf")),
+                                             pe_max=float(params.get("pe_max", "inf")),
+                                             pb_min=float(params.get("pb_min", "-inf")),
+                                             pb_max=float(params.get("pb_max", "inf")))
+
+    if len(parts) == 2 and parts[0] == "ratios":
+        record = snapshot.ratios.get(parts[1].upper())
+        if record is None:
+            return 404, {"error": "Unknown ticker: " + parts[1]}
+        return 200, record
+
+    if parts == ["top"]:
+        by = params.get("by", "PE").upper()
+        order = params.get("order", "asc").lower()
+        if by not in ("PE", "PB"):
+            raise ValueError("by must be PE or PB")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be asc or desc")
+        return 200, snapshot.top(by=by, k=parse_k(params), descending=order == "desc")
+
+    if parts == ["screen"]:
+        return 200, snapshot.screen
+
+    if parts == ["forecasts"]:
+        if "k" in params:
+            return 200, snapshot.forecasts[:parse_k(params)]
+        return 200, snapshot.forecasts
+
+    if len(parts) == 2 and parts[0] == "forecasts":
+        record = snapshot.final_stocks.get(parts[1].upper())
+        if record is None:
+            return 404, {"error": "No forecast for ticker: " + parts[1]}
+        return 200, record
+
+    return 404, {"error": "Unknown path: /" + "/".join(parts)}
+
+
+def parse_k(params: Dict) -> int:
+    k = int(params.get("k", DEFAULT_K))
+    if k < 0:
+        raise ValueError("k must not be negative")
+    return k
+
+
+def main():
+    database_file_path = sys.argv[1] if len(sys.argv) > 1 else DB_FILE_PATH
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+
+    print("Loading data from " + database_file_path)
+    store = DataStore(database_file_path=database_file_path)
+    store.start()
+    print("Loaded " + str(len(store.snapshot.ratios)) + " tickers and "
+          + str(len(store.snapshot.final_stocks)) + " final stock picks")
+
+    server = ThreadingHTTPServer((HOST, port), QueryHandler)
+    server.daemon_threads = True
+    server.store = store
+    print("Serving on http://" + HOST + ":" + str(port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
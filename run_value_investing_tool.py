@@ -7,13 +7,15 @@ import pandas as pd
 
 from Smurfit.ValueInvesting.predictive_modelling import prophet_price_prediction
 from Smurfit.ValueInvesting.twitter import twitter_analysis
-from sqlite_handling import get_existing_data
+from sqlite_handling import get_existing_data, save_final_stocks
 from clean_data import calculate_figures, get_low_pe_pb_stocks, get_high_pe_pb_stocks, calculate_returns
 from get_data import download_price_data
 
 DB_FILE_PATH = os.path.join(r"C:Users\barry\Python\Smurfit\ValueInvesting", "ratios_data.db")
 TIME_PERIOD = "5y"
 INTERVAL = "1wk"
+# "drop" duplicate tweets (bot reposts, templated spam) or "reuse" their original's sentiment scores
+DUPLICATE_TWEETS = "drop"
 
 
 def main():
@@ -42,11 +44,15 @@ def main():
     # perform sentiment analysis using TextBlob and data from Twitter API
     twitter_data = twitter_analysis(tickers=low_pe_and_pb_stocks,
                                     start_time=pd.Timestamp.now() - pd.Timedelta(INTERVAL),
-                                    end_time=pd.Timestamp.now()
+                                    end_time=pd.Timestamp.now(),
+                                    duplicate_tweets=DUPLICATE_TWEETS
                                     )
 
     # plot the predictions of chosen stocks using prophet module
-    prophet_price_prediction(sentiment_df=twitter_data, ratios_df=ratios_df)
+    final_stocks = prophet_price_prediction(sentiment_df=twitter_data, ratios_df=ratios_df)
+
+    # save the final stock picks so they can be served by query_service.py
+    save_final_stocks(database_name=DB_FILE_PATH, final_stocks=final_stocks)
 
 
 if __name__ == "__main__":
@@ -70,3 +70,34 @@ def get_existing_data(database_file_path: str):
     ratios_df = ratios_df.set_index("Tickers")
 
     return ratios_df
+
+
+def save_final_stocks(database_name: str, final_stocks: pd.DataFrame):
+    """
+    Save the final stock picks and their predicted prices to the sqlite database,
+    replacing any picks saved by a previous run
+    :param database_name: Name of database to connect and add data to
+    :param final_stocks: Dataframe of final stock picks from prophet_price_prediction
+    :return: None
+    """
+    con = lite.connect(database_name)
+    curs = con.cursor()
+
+    curs.execute(""" DROP TABLE IF EXISTS final_stocks
+        """)
+
+    curs.execute(""" CREATE TABLE final_stocks (
+            Ticker text,
+            PE real,
+            PB real,
+            CurrentPrice real,
+            PredictedPrice real,
+            PriceIncrease real
+        )""")
+
+    # Get each line of the dataframe into a list of list - for adding to database
+    final_stocks_list = list(final_stocks.itertuples(index=False, name=None))
+    curs.executemany("INSERT INTO final_stocks VALUES (?, ?, ?, ?, ?, ?)", final_stocks_list)
+    con.commit()
+    con.close()
+    pass
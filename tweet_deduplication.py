@@ -0,0 +1,153 @@
+"""
+Functions used to find exact and near duplicate tweets (bot reposts, templated spam) so each
+distinct tweet is only scored once. Exact duplicates are found by hashing the normalized text,
+near duplicates with MinHash signatures and locality sensitive hashing (LSH).
+"""
+import hashlib
+import operator
+import re
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+# set global variables
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16  # 16 bands of 4 rows, tweets with similarity >= 0.8 become candidates >99.9% of the time
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+MAX_TRACKED_TWEETS = 10000
+MAX_BUCKET_SIZE = 20
+
+_BIN_BITS = 6  # 2 ** 6 == NUM_PERMUTATIONS bins
+_EMPTY_BIN = 1 << 64
+
+
+def normalize_tweet(tweet: str) -> str:
+    """
+    Normalize a cleaned tweet so copies that differ only in case, mentions, punctuation or spacing match
+    :param tweet: Cleaned tweet
+    :return: Normalized tweet
+    """
+    twt = tweet.lower()
+    twt = re.sub(r'@\w+', '', twt)  # removes mentions
+    twt = re.sub(r'[^\w$#\s]', '', twt)  # removes punctuation, keeps cashtags and hashtags
+    twt = re.sub(r'\s+', ' ', twt).strip()  # collapses whitespace
+    return twt
+
+
+def minhash_signature(text: str) -> tuple:
+    """
+    Compute the MinHash signature of a normalized tweet over its character shingles.
+    Uses one permutation hashing: each shingle is hashed once and the hash picks one of
+    NUM_PERMUTATIONS bins to take the minimum of, so the cost is linear in the tweet length.
+    Empty bins borrow the value of the next non-empty bin so short tweets still compare well.
+    :param text: Normalized tweet
+    :return: Tuple of NUM_PERMUTATIONS minimum hash values
+    """
+    signature = [_EMPTY_BIN] * NUM_PERMUTATIONS
+    for i in range(max(len(text) - SHINGLE_SIZE + 1, 1)):
+        # deterministic 64-bit hash, unlike hash() which is randomized per process,
+        # so the same tweets are always deduplicated the same way
+        h = int.from_bytes(hashlib.blake2b(text[i:i + SHINGLE_SIZE].encode('utf-8'), digest_size=8).digest(), 'little')
+        b = h & (NUM_PERMUTATIONS - 1)
+        value = h >> _BIN_BITS
+        if value < signature[b]:
+            signature[b] = value
+
+    # densify, filling each empty bin from the next non-empty bin to the right
+    for b in range(NUM_PERMUTATIONS):
+        if signature[b] == _EMPTY_BIN:
+            for offset in range(1, NUM_PERMUTATIONS):
+                value = signature[(b + offset) % NUM_PERMUTATIONS]
+                if value < _EMPTY_BIN:
+                    signature[b] = value + offset * _EMPTY_BIN
+                    break
+
+    return tuple(signature)
+
+
+class TweetDeduplicator:
+    """
+    Streaming duplicate detector. Only the most recent MAX_TRACKED_TWEETS distinct tweets are
+    remembered, and each LSH bucket holds at most MAX_BUCKET_SIZE tweets, so memory is bounded and
+    each tweet is checked in constant time.
+    """
+
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD, max_tracked: int = MAX_TRACKED_TWEETS):
+        """
+        :param similarity_threshold: Estimated Jaccard similarity at which tweets count as duplicates
+        :param max_tracked: Maximum number of distinct tweets to remember
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_tracked = max_tracked
+        self._exact = {}
+        self._tracked = OrderedDict()  # key -> (exact hash, signature, band keys)
+        self._buckets = {}
+
+    def check(self, tweet: str, key) -> Optional[object]:
+        """
+        Check a tweet against the tweets seen so far and remember it if it is new
+        :param tweet: Cleaned tweet
+        :param key: Identifier to remember the tweet by
+        :return: Key of the earlier tweet this duplicates, or None if the tweet is new
+        """
+        text = normalize_tweet(tweet)
+        exact_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        if exact_hash in self._exact:
+            return self._exact[exact_hash]
+
+        signature = minhash_signature(text)
+        rows = NUM_PERMUTATIONS // NUM_BANDS
+        band_keys = [(band, signature[band * rows:(band + 1) * rows]) for band in range(NUM_BANDS)]
+
+        # compare against the tweets sharing at least one band
+        checked = set()
+        for band_key in band_keys:
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                candidate_signature = self._tracked[candidate][1]
+                matches = sum(map(operator.eq, signature, candidate_signature))
+                if matches / NUM_PERMUTATIONS >= self.similarity_threshold:
+                    return candidate
+
+        self._remember(key, exact_hash, signature, band_keys)
+        return None
+
+    def _remember(self, key, exact_hash: bytes, signature: tuple, band_keys: List):
+        self._exact[exact_hash] = key
+        self._tracked[key] = (exact_hash, signature, band_keys)
+        for band_key in band_keys:
+            bucket = self._buckets.setdefault(band_key, [])
+            bucket.append(key)
+            if len(bucket) > MAX_BUCKET_SIZE:
+                bucket.pop(0)
+
+        # forget the oldest tweet once too many are tracked
+        if len(self._tracked) > self.max_tracked:
+            old_key, (old_hash, _, old_band_keys) = self._tracked.popitem(last=False)
+            del self._exact[old_hash]
+            for band_key in old_band_keys:
+                bucket = self._buckets.get(band_key)
+                if bucket is not None and old_key in bucket:
+                    bucket.remove(old_key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+
+def find_duplicate_tweets(tweets: Iterable[str], similarity_threshold: float = SIMILARITY_THRESHOLD,
+                          max_tracked: int = MAX_TRACKED_TWEETS) -> List[int]:
+    """
+    Find the original of each tweet in a stream of cleaned tweets
+    :param tweets: Cleaned tweets, in the order they were received
+    :param similarity_threshold: Estimated Jaccard similarity at which tweets count as duplicates
+    :param max_tracked: Maximum number of distinct tweets to remember
+    :return: List with, for each tweet, the position of the first tweet it duplicates or its own position
+    """
+    deduplicator = TweetDeduplicator(similarity_threshold=similarity_threshold, max_tracked=max_tracked)
+    originals = []
+    for position, tweet in enumerate(tweets):
+        original = deduplicator.check(tweet, key=position)
+        originals.append(position if original is None else original)
+
+    return originals
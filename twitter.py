@@ -8,13 +8,23 @@ import pandas as pd
 import tweepy
 
 from Smurfit.ValueInvesting.clean_data import clean_tweet, get_subjectivity, get_polarity, get_sentiment
+from Smurfit.ValueInvesting.tweet_deduplication import find_duplicate_tweets
 from Smurfit.ValueInvesting.tweepy_auth import AUTHENTICATION_TOKEN_BEAR_TOKEN
 
 
-def twitter_analysis(tickers: List, start_time: pd.Timestamp, end_time: pd.Timestamp):
+def twitter_analysis(tickers: List, start_time: pd.Timestamp, end_time: pd.Timestamp, duplicate_tweets: str = "drop"):
     """
     Function to get data from Twitter and perform sentiment analysis using TextBlob
+    :param tickers: List of tickers to get tweets for
+    :param start_time: Time to get tweets from
+    :param end_time: Time to get tweets until
+    :param duplicate_tweets: What to do with exact and near duplicate tweets, "drop" them or "reuse" the
+                             original tweet's scores so they are still counted
+    :return: Dataframe of the number of positive, neutral and negative tweets for each stock
     """
+    if duplicate_tweets not in ("drop", "reuse"):
+        raise ValueError('duplicate_tweets must be "drop" or "reuse"')
+
     # activate client
     client = tweepy.Client(AUTHENTICATION_TOKEN_BEAR_TOKEN, wait_on_rate_limit=True)
 
@@ -75,9 +85,16 @@ def twitter_analysis(tickers: List, start_time: pd.Timestamp, end_time: pd.Times
         # clean the tweets
         tweets_df["Cleaned_Tweets"] = tweets_df["Tweets"].apply(clean_tweet)
 
-        # Create two new columns called Subjectivity and pPlarity
-        tweets_df['Subjectivity'] = tweets_df['Cleaned_Tweets'].apply(get_subjectivity)
-        tweets_df['Polarity'] = tweets_df['Cleaned_Tweets'].apply(get_polarity)
+        # Find bot reposts and templated spam, each tweet gets the index of the first tweet it duplicates
+        tweets_df['Original_Tweet'] = find_duplicate_tweets(tweets_df['Cleaned_Tweets'])
+        original_tweets_df = tweets_df[tweets_df['Original_Tweet'] == tweets_df.index].copy()
+        if duplicate_tweets == "drop":
+            tweets_df = original_tweets_df
+
+        # Create two new columns called Subjectivity and Polarity
+        # Only the original tweets are scored, duplicates reuse the scores of their original
+        tweets_df['Subjectivity'] = tweets_df['Original_Tweet'].map(original_tweets_df['Cleaned_Tweets'].apply(get_subjectivity))
+        tweets_df['Polarity'] = tweets_df['Original_Tweet'].map(original_tweets_df['Cleaned_Tweets'].apply(get_polarity))
 
         # Create a column to store the text sentiment
         tweets_df['Sentiment'] = tweets_df['Polarity'].apply(get_sentiment)